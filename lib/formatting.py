@@ -1,4 +1,4 @@
-from typing import List
+from typing import Dict, Iterator, List, Optional, Tuple
 
 from slack_bolt import BoltContext
 
@@ -10,6 +10,9 @@ from vendor.chatgptinslack.app.openai_ops import (
 
 MAX_CHUNK_LENGTH = 3000  # 4000 is approximately the maximum length of a Slack message
 
+# System text by (template, translate_markdown, bot user ID, locale): everything it depends on
+_SYSTEM_TEXT_CACHE: Dict[Tuple[str, bool, Optional[str], Optional[str]], str] = {}
+
 
 def format_llm_message_for_slack(content: str, translate_markdown: bool) -> str:
     """
@@ -52,20 +55,22 @@ def get_system_text(
         context (BoltContext): The context object for the Bolt framework.
 
     Returns:
-        str: The generated system text.
+        str: The generated system text, built once per bot user and locale.
 
     """
-    return build_system_text(system_text_template, translate_markdown, context)
+    key = (system_text_template, translate_markdown, context.bot_user_id, context.get("locale"))
+    system_text = _SYSTEM_TEXT_CACHE.get(key)
+    if system_text is None:
+        system_text = build_system_text(system_text_template, translate_markdown, context)
+        _SYSTEM_TEXT_CACHE[key] = system_text
+    return system_text
 
 
 def split_message(message: str, max_chunk_length: int = MAX_CHUNK_LENGTH) -> List[str]:
     """
     Split a long message into chunks that fit within the specified max_chunk_length.
 
-    This method processes a given message string and splits it into smaller chunks
-    so that each chunk's length does not exceed the provided max_chunk_length. It can handle
-    multi-line messages by splitting them appropriately at newline characters while
-    ensuring that each resulting chunk is within the length constraint.
+    See `iter_split_message` for how the message is split.
 
     Args:
         message (str): The input message string to be split into chunks.
@@ -73,34 +78,69 @@ def split_message(message: str, max_chunk_length: int = MAX_CHUNK_LENGTH) -> Lis
 
     Returns:
         List[str]: A list of message chunks, each of which adheres to the max_length constraint.
+    """
+    return list(iter_split_message(message, max_chunk_length))
+
+
+def iter_split_message(message: str, max_chunk_length: int = MAX_CHUNK_LENGTH) -> Iterator[str]:
+    """
+    Lazily split a long message into chunks that fit within the specified max_chunk_length.
+
+    This method processes a given message string and yields smaller chunks so that
+    each chunk's length does not exceed the provided max_chunk_length. It can handle
+    multi-line messages by splitting them appropriately at newline characters while
+    ensuring that each resulting chunk is within the length constraint. Each chunk is
+    built only when the caller asks for it, so it can be sent before the next is built.
+
+    Args:
+        message (str): The input message string to be split into chunks.
+        max_chunk_length (int): The maximum allowed length for each chunk.
+
+    Yields:
+        str: The next message chunk, which adheres to the max_length constraint.
 
     Behavior:
         - The method iterates through each line in the input message.
-        - It accumulates lines into the current_chunk until adding another line would
+        - It accumulates lines into the current chunk until adding another line would
             exceed the max_length.
-        - If adding another line exceeds the max_length, the current_chunk is added to
-            the chunks list and reset.
+        - If adding another line exceeds the max_length, the current chunk's lines are
+            joined, yielded and reset.
         - If an individual line exceeds the max_length by itself, it is split into
             smaller parts that fit within the max_length.
-        - The accumulated current_chunk (if any) is appended to the chunks list at the end.
+        - The accumulated current chunk (if any) is yielded at the end.
     """
-    chunks = []
-    current_chunk = ""
+    if len(message) < max_chunk_length:
+        # Fits in a single chunk (the common case), no need to scan for lines
+        yield message.strip()
+        return
 
-    for line in message.split("\n"):
-        if len(current_chunk) + len(line) + 1 > max_chunk_length:
-            if current_chunk:
-                chunks.append(current_chunk.strip())
-                current_chunk = ""
+    # Lines of the chunk being built, joined once when the chunk is flushed
+    current_lines: List[str] = []
+    current_length = 0
 
-            # If a single line is longer than max_length, split it
-            while len(line) > max_chunk_length:
-                chunks.append(line[:max_chunk_length])
-                line = line[max_chunk_length:]
-
-        current_chunk += line + "\n"
-
-    if current_chunk:
-        chunks.append(current_chunk.strip())
-
-    return chunks
+    for line in message.split("\n"):
+        if current_length + len(line) + 1 > max_chunk_length:
+            if current_lines:
+                yield "\n".join(current_lines).strip()
+                current_lines = []
+                current_length = 0
+
+            # If a single line is longer than max_length, split it, preferring the last
+            # space within the limit so words are kept whole; the last (at most
+            # max_length) piece starts the next chunk
+            start = 0
+            while len(line) - start > max_chunk_length:
+                end = line.rfind(" ", start + 1, start + max_chunk_length + 1)
+                if end == -1:
+                    yield line[start : start + max_chunk_length]
+                    start += max_chunk_length
+                else:
+                    yield line[start:end]
+                    start = end + 1
+            line = line[start:]
+
+        current_lines.append(line)
+        current_length += len(line) + 1
+
+    if current_lines:
+        yield "\n".join(current_lines).strip()
@@ -1,21 +1,138 @@
+import functools
+import hashlib
 import logging
 import os
+import threading
+from collections import OrderedDict
 from importlib import import_module
 from typing import Dict, List, Optional, Tuple, Union
 
 import litellm
+import orjson
 
 from lib import env
 
 # TODO Use create_litellm_client
 
 FUNCTION_CALL_TOKEN_COUNT = 100  # Placeholder value, adjust based on your function call complexity
+TOKEN_CACHE_SIZE = 4096  # Max number of per-message token counts kept by LLMClient
+# Tokens per image block; about width * height / 750 for the 1024 px images FilePlugin sends
+IMAGE_TOKEN_COUNT = 1400
+
+
+@functools.lru_cache(maxsize=32)
+def get_max_context_tokens(
+    model: str, max_response_tokens: int, function_call_module_name: str = ""
+) -> int:
+    """
+    Get the number of prompt tokens available for the given model and settings.
+
+    Args:
+        model (str): The LiteLLM model name.
+        max_response_tokens (int): The number of tokens reserved for the response.
+        function_call_module_name (str): The function call module, if any.
+
+    Returns:
+        int: The maximum number of tokens the prompt messages may use.
+    """
+    max_context_tokens = litellm.model_cost[model]["max_input_tokens"] - max_response_tokens - 1
+    if function_call_module_name:
+        # Assuming a fixed token count for function calls
+        max_context_tokens -= FUNCTION_CALL_TOKEN_COUNT
+    return max_context_tokens
+
+
+@functools.lru_cache(maxsize=32)
+def get_reply_priming_tokens(model: str) -> int:
+    """
+    Get the tokens `litellm.token_counter` adds once per call rather than per message.
+
+    For OpenAI-style counting this is the 3 tokens that prime the assistant's reply. It is
+    measured as the difference between counting a message twice in one call and in two
+    separate calls.
+
+    Args:
+        model (str): The LiteLLM model name.
+
+    Returns:
+        int: The number of tokens counted once per call.
+    """
+    message = {"role": "user", "content": "hello"}
+    single = litellm.token_counter(model=model, messages=[message])
+    double = litellm.token_counter(model=model, messages=[message, message])
+    return max(0, 2 * single - double)
+
+
+def count_uncounted_tokens(model: str, message: Dict) -> int:
+    """
+    Count the parts of a message that `litellm.token_counter` skips.
+
+    These are an assistant's function call (name and arguments) and image blocks in the
+    Anthropic/Bedrock format (`{"type": "image", "source": ...}`); OpenAI `image_url`
+    blocks are already counted.
+
+    Args:
+        model (str): The LiteLLM model name.
+        message (Dict): The message to count.
+
+    Returns:
+        int: The number of tokens in the skipped parts.
+    """
+    num_tokens = 0
+    function_call = message.get("function_call")
+    if function_call:
+        num_tokens += litellm.token_counter(
+            model=model,
+            text=(function_call.get("name") or "") + (function_call.get("arguments") or ""),
+        )
+    content = message.get("content")
+    if isinstance(content, list):
+        num_tokens += IMAGE_TOKEN_COUNT * sum(
+            1 for part in content if isinstance(part, dict) and part.get("type") == "image"
+        )
+    return num_tokens
+
+
+@functools.lru_cache(maxsize=32)
+def load_functions(function_call_module_name: str) -> List[Dict]:
+    """
+    Get the function definitions exposed by a function call module, loaded once per module.
+
+    Args:
+        function_call_module_name (str): The module that defines `functions`.
+
+    Returns:
+        List[Dict]: The module's function definitions.
+    """
+    return import_module(function_call_module_name).functions
+
+
+def serialize_message(message: Dict) -> bytes:
+    """
+    Serialize a message to bytes, e.g. to derive a cache key from it.
+
+    Uses orjson, falling back to the message's `str()` for values it cannot encode.
+
+    Args:
+        message (Dict): The message to serialize.
+
+    Returns:
+        bytes: The serialized message.
+    """
+    try:
+        return orjson.dumps(message)
+    except TypeError:
+        pass  # e.g. non-JSON values such as LiteLLM response objects
+    return str(message).encode("utf-8", "surrogatepass")
 
 
 class LLMClient:
     def __init__(self) -> None:
         self.setup_litellm()
         self.logger: logging.Logger = logging.getLogger(__name__)
+        # LRU of message digest -> token count, shared by all handler threads
+        self._token_cache: "OrderedDict[bytes, int]" = OrderedDict()
+        self._token_cache_lock = threading.Lock()
 
     def setup_litellm(self) -> None:
         litellm.REPEATED_STREAMING_CHUNK_LIMIT = 100
@@ -73,7 +190,7 @@ class LLMClient:
         kwargs = {}
 
         if function_call_module_name is not None:
-            kwargs["functions"] = import_module(function_call_module_name).functions
+            kwargs["functions"] = load_functions(function_call_module_name)
 
         if env.PROVIDER == "bedrock":
             return litellm.completion(
@@ -99,12 +216,13 @@ class LLMClient:
         )
 
     @staticmethod
+    @functools.lru_cache(maxsize=None)
     def is_model_able_to_receive_images() -> bool:
         """
         Determines if the model is able to receive images.
 
-        Args:
-            context (BoltContext): The context object containing the model information.
+        The configured model is fixed for the lifetime of the process, so the result is
+        computed once and cached.
 
         Returns:
             bool: True if the model is able to receive images, False otherwise.
@@ -113,6 +231,44 @@ class LLMClient:
         can_send_image_url = model is not None and litellm.supports_vision(model)
         return can_send_image_url
 
+    def count_message_tokens(self, message: Dict[str, Union[str, Dict[str, str]]]) -> int:
+        """
+        Count the tokens of a single message, reusing earlier counts.
+
+        Conversation history is re-sent on every turn, so most messages have already been
+        tokenized by a previous request. Counts are cached by a digest of the message rather
+        than the message text itself, which can be large (e.g. base64-encoded images).
+
+        The count excludes the tokens counted once per request (see
+        `get_reply_priming_tokens`), so per-message counts can be summed, and includes the
+        parts `litellm.token_counter` skips (see `count_uncounted_tokens`).
+
+        Args:
+            message (Dict[str, Union[str, Dict[str, str]]]): The message to count.
+
+        Returns:
+            int: The number of tokens in the message.
+        """
+        key = hashlib.blake2b(serialize_message(message), digest_size=16).digest()
+        with self._token_cache_lock:
+            num_tokens = self._token_cache.get(key)
+            if num_tokens is not None:
+                self._token_cache.move_to_end(key)
+                return num_tokens
+
+        # Count the message as the chat API sees it (content text plus per-message overhead)
+        # rather than its Python repr, which adds dict punctuation and tokenizes image data
+        num_tokens = (
+            litellm.token_counter(model=env.LLM_MODEL, messages=[message])
+            - get_reply_priming_tokens(env.LLM_MODEL)
+            + count_uncounted_tokens(env.LLM_MODEL, message)
+        )
+        with self._token_cache_lock:
+            self._token_cache[key] = num_tokens
+            if len(self._token_cache) > TOKEN_CACHE_SIZE:
+                self._token_cache.popitem(last=False)
+        return num_tokens
+
     def messages_within_context_window(
         self,
         messages: List[Dict[str, Union[str, Dict[str, str]]]],
@@ -122,42 +278,49 @@ class LLMClient:
         Adjusts a list of messages to ensure they fit within the token context window
         for the configured model.
         """
-        model = env.LLM_MODEL
-        max_tokens = env.MAX_RESPONSE_TOKENS
-        max_context_tokens = litellm.model_cost[model]["max_input_tokens"] - max_tokens - 1
-
-        if function_call_module_name:
-            max_context_tokens -= 100  # Assuming a fixed token count for function calls
+        max_context_tokens = get_max_context_tokens(
+            env.LLM_MODEL, env.MAX_RESPONSE_TOKENS, function_call_module_name
+        )
 
         self.logger.info(f"Max context tokens: {max_context_tokens}")
 
-        def count_tokens(msgs):
-            return sum(litellm.token_counter(model=model, text=str(msg)) for msg in msgs)
+        # Tokenize each message exactly once; trimming then only adjusts a running total
+        token_counts = {id(msg): self.count_message_tokens(msg) for msg in messages}
 
         # Always keep the system message if present
         system_message = next((msg for msg in messages if msg["role"] == "system"), None)
         messages_to_trim = [msg for msg in messages if msg["role"] != "system"]
 
-        initial_token_count = count_tokens(messages)
+        # Per-message counts exclude the per-request overhead, which is added once here
+        reply_priming_tokens = get_reply_priming_tokens(env.LLM_MODEL)
+        initial_token_count = reply_priming_tokens + sum(token_counts[id(msg)] for msg in messages)
         self.logger.info(f"Initial token count: {initial_token_count}")
 
-        while (
-            count_tokens(messages_to_trim)
-            + (count_tokens([system_message]) if system_message else 0)
-            > max_context_tokens
-        ):
-            if not messages_to_trim:
+        if initial_token_count <= max_context_tokens:
+            # Common case: the conversation already fits, nothing to trim
+            return messages, initial_token_count, max_context_tokens
+
+        final_token_count = (
+            reply_priming_tokens
+            + sum(token_counts[id(msg)] for msg in messages_to_trim)
+            + (token_counts[id(system_message)] if system_message else 0)
+        )
+        # Drop the oldest messages by advancing a start index, then slice once
+        start = 0
+        while final_token_count > max_context_tokens:
+            if start == len(messages_to_trim):
                 self.logger.warning(
                     "All trimmable messages removed, but still exceeding token limit."
                 )
                 break
-            removed_message = messages_to_trim.pop(0)
+            removed_message = messages_to_trim[start]
+            start += 1
+            final_token_count -= token_counts[id(removed_message)]
             self.logger.info(f"Removed message: {removed_message['role']}")
 
         # Reconstruct the messages list
-        final_messages = ([system_message] if system_message else []) + messages_to_trim
+        final_messages = ([system_message] if system_message else []) + messages_to_trim[start:]
 
-        final_token_count = count_tokens(final_messages)
         self.logger.info(f"Final token count: {final_token_count}")
 
         if final_token_count > max_context_tokens:
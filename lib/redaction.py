@@ -0,0 +1,63 @@
+import functools
+import re
+from typing import Pattern, Tuple
+
+from lib import env
+
+# Setting and replacement text for each redaction pattern, in the order they are applied;
+# card numbers go before phone numbers, which would otherwise match (and leave behind) part
+# of a card number
+REDACT_PATTERN_SETTINGS = (
+    ("REDACT_EMAIL_PATTERN", "[EMAIL]"),
+    ("REDACT_CREDIT_CARD_PATTERN", "[CREDIT CARD]"),
+    ("REDACT_PHONE_PATTERN", "[PHONE]"),
+    ("REDACT_SSN_PATTERN", "[SSN]"),
+    ("REDACT_USER_DEFINED_PATTERN", "[REDACTED]"),
+)
+
+
+@functools.lru_cache(maxsize=None)
+def get_redact_patterns() -> Tuple[Tuple[Pattern[str], str], ...]:
+    """
+    Compile the configured redaction patterns, once, on first use.
+
+    Patterns are only compiled once redaction is actually used, so an invalid pattern
+    doesn't break the app while redaction is disabled.
+
+    Returns:
+        Tuple[Tuple[Pattern[str], str], ...]: Each compiled pattern with its replacement
+        text, in the order they are applied.
+
+    Raises:
+        ValueError: If a configured pattern is not a valid regular expression.
+    """
+    patterns = []
+    for setting, replacement in REDACT_PATTERN_SETTINGS:
+        try:
+            patterns.append((re.compile(getattr(env, setting)), replacement))
+        except re.error as e:
+            raise ValueError(f"Invalid {setting}: {e}") from e
+    return tuple(patterns)
+
+
+def redact_string(input_string: str) -> str:
+    """
+    Redact sensitive information from a string.
+
+    The patterns are applied one after another, so each one sees the text left by the
+    previous ones (e.g. card numbers are redacted before the phone pattern can match part
+    of one).
+
+    Args:
+        input_string (str): The text to redact.
+
+    Returns:
+        str: The text with every match of the configured redaction patterns replaced,
+        or the input unchanged if redaction is disabled.
+    """
+    if not env.REDACTION_ENABLED:
+        return input_string
+
+    for pattern, replacement in get_redact_patterns():
+        input_string = pattern.sub(replacement, input_string)
+    return input_string
@@ -1,25 +1,67 @@
+import functools
 import logging
+import threading
 import time
-from typing import Any, Dict, List, Optional
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
 
 from slack_bolt import BoltContext
 from slack_sdk.errors import SlackApiError
 from slack_sdk.web import WebClient
 
-from lib.formatting import format_llm_message_for_slack, split_message
+from lib.formatting import format_llm_message_for_slack, iter_split_message
 from vendor.chatgptinslack.app.i18n import translate
 from vendor.chatgptinslack.app.slack_constants import DEFAULT_LOADING_TEXT
 from vendor.chatgptinslack.app.slack_ops import (
     find_parent_message,
-    is_this_app_mentioned,
     post_wip_message,
     update_wip_message,
 )
 
 
+PARENT_MESSAGE_CACHE_TTL_SECONDS = 60
+PARENT_MESSAGE_CACHE_SIZE = 4096
+
+# LRU of (channel ID, thread ts) -> (time fetched, parent message), shared by all handler threads
+_parent_message_cache: "OrderedDict[Tuple[str, str], Tuple[float, Optional[dict]]]" = OrderedDict()
+_parent_message_cache_lock = threading.Lock()
+
+
+def find_parent_message_cached(
+    client: WebClient, channel_id: Optional[str], thread_ts: str
+) -> Optional[dict]:
+    """
+    Find the parent message of a thread, reusing lookups from the last minute.
+
+    Every message in an active thread needs the parent to check for a bot mention, so
+    without the cache each one costs a Slack API call for the same message.
+    """
+    key = (channel_id or "", thread_ts)
+    now = time.monotonic()
+    with _parent_message_cache_lock:
+        cached = _parent_message_cache.get(key)
+        if cached is not None and now - cached[0] < PARENT_MESSAGE_CACHE_TTL_SECONDS:
+            _parent_message_cache.move_to_end(key)
+            return cached[1]
+
+    parent_message = find_parent_message(client, channel_id, thread_ts)
+    with _parent_message_cache_lock:
+        _parent_message_cache[key] = (now, parent_message)
+        _parent_message_cache.move_to_end(key)
+        if len(_parent_message_cache) > PARENT_MESSAGE_CACHE_SIZE:
+            _parent_message_cache.popitem(last=False)
+    return parent_message
+
+
+@functools.lru_cache(maxsize=256)
+def get_mention_token(bot_user_id: str) -> str:
+    """Get the text Slack uses to mention the given user, built once per user ID."""
+    return f"<@{bot_user_id}>"
+
+
 def is_bot_mentioned(context: BoltContext, payload: dict) -> bool:
     """Check if the bot is mentioned in the message."""
-    return f"<@{context.bot_user_id}>" in payload.get("text", "")
+    return get_mention_token(context.bot_user_id) in (payload.get("text") or "")  # type: ignore
 
 
 def send_wip_message(
@@ -44,21 +86,18 @@ def send_wip_message(
     )
 
 
-def handle_long_message(
+def post_long_message_error(
     client: WebClient,
     context: BoltContext,
-    wip_reply: dict,
+    payload: dict,
     num_context_tokens: int,
     max_context_tokens: int,
 ):
-    """Handle cases where the message is too long."""
-    update_wip_message(
-        client=client,
+    """Tell the user the conversation is too long, without a work-in-progress message to update."""
+    client.chat_postMessage(
         channel=context.channel_id,  # type: ignore
-        ts=wip_reply["message"]["ts"],
+        thread_ts=payload.get("thread_ts", payload.get("ts")),
         text=f":warning: The previous message is too long ({num_context_tokens}/{max_context_tokens} prompt tokens).",
-        messages=[],
-        user=context.user_id,  # type: ignore
     )
 
 
@@ -67,35 +106,46 @@ def is_bot_mentioned_in_thread(client: WebClient, context: BoltContext, payload:
     thread_ts = payload.get("thread_ts")
     if not thread_ts:
         return False
-    parent_message = find_parent_message(client, context.channel_id, thread_ts)
-    return parent_message is not None and is_this_app_mentioned(context, parent_message)
+    parent_message = find_parent_message_cached(client, context.channel_id, thread_ts)
+    return parent_message is not None and is_bot_mentioned(context, parent_message)
 
 
 def handle_error(
     client: WebClient,
     context: BoltContext,
+    payload: dict,
     wip_reply: Optional[dict],
     logger,
     error_message: str,
     openai_api_key: str,
 ):
-    """Handle general errors."""
-    text = (
-        (wip_reply.get("message", {}).get("text", "") or "")  # type: ignore
-        + "\n\n"
-        + translate(
-            openai_api_key=openai_api_key,
-            context=context,
-            text=f":warning: Failed to start a conversation with ChatGPT: {error_message}",
-        )
+    """
+    Handle general errors.
+
+    The error is appended to the work-in-progress message, or posted in the thread if the
+    failure happened before that message was sent.
+    """
+    error_text = translate(
+        openai_api_key=openai_api_key,
+        context=context,
+        text=f":warning: Failed to start a conversation with ChatGPT: {error_message}",
     )
-    logger.exception(text)
-    if wip_reply:
-        client.chat_update(
+    if not wip_reply:
+        logger.exception(error_text)
+        client.chat_postMessage(
             channel=context.channel_id,  # type: ignore
-            ts=wip_reply["message"]["ts"],
-            text=text,
+            thread_ts=payload.get("thread_ts", payload.get("ts")),
+            text=error_text,
         )
+        return
+
+    text = (wip_reply.get("message", {}).get("text", "") or "") + "\n\n" + error_text
+    logger.exception(text)
+    client.chat_update(
+        channel=context.channel_id,  # type: ignore
+        ts=wip_reply["message"]["ts"],
+        text=text,
+    )
 
 
 def send_long_message_in_chunks(
@@ -129,35 +179,40 @@ def send_long_message_in_chunks(
     Raises:
     - SlackApiError: If there is an error while sending any of the message chunks.
     """
-    chunks = split_message(text)
-
-    logger.info(f"Splitting message into {len(chunks)} chunks")
+    chunks = iter_split_message(text)
 
+    # BoltContext.channel_id is a dict lookup behind a property; resolve it once
+    channel = context.channel_id
     thread_ts = wip_reply["message"]["ts"]
-    first_chunk = True
+    num_chunks = 0
 
-    for chunk in chunks:
+    # Look one chunk ahead so the last chunk is known without building them all up front
+    next_chunk = next(chunks, None)
+    while next_chunk is not None:
+        chunk, next_chunk = next_chunk, next(chunks, None)
         try:
-            if first_chunk:
+            if num_chunks == 0:
                 # Update the original message with the first chunk
                 response = client.chat_update(
-                    channel=context.channel_id,  # type: ignore
+                    channel=channel,  # type: ignore
                     ts=thread_ts,
                     text=chunk + loading_character,
                 )
-                first_chunk = False
             else:
                 # Send subsequent chunks as replies
                 response = client.chat_postMessage(
-                    channel=context.channel_id,  # type: ignore
+                    channel=channel,  # type: ignore
                     thread_ts=thread_ts,
-                    text=chunk + (loading_character if chunk != chunks[-1] else ""),
+                    text=chunk + (loading_character if next_chunk is not None else ""),
                 )
+            num_chunks += 1
             logger.info(f"Successfully sent chunk of length {len(chunk)}")
         except SlackApiError as e:
             logger.error(f"Error sending message chunk: {e}")
             raise
 
+    logger.info(f"Sent message in {num_chunks} chunks")
+
     wip_reply["message"]["text"] = text
     return response
 
@@ -230,15 +285,16 @@ def get_messages_in_context(
         List[Dict[str, Any]]: A list of relevant messages for the given context.
     """
     if is_in_dm_with_bot and not thread_ts:
-        # For DMs, get recent message history
+        # For DMs, get message history from the last 24 hours; Slack filters by `oldest`,
+        # so older messages are never transferred or scanned
         past_messages = client.conversations_history(  # type: ignore
             channel=context.channel_id,  # type: ignore
             include_all_metadata=True,
+            oldest=f"{time.time() - 86400:.6f}",
             limit=100,
         ).get("messages", [])
         past_messages.reverse()
-        # Filter messages from the last 24 hours
-        return [msg for msg in past_messages if time.time() - float(msg.get("ts", 0)) < 86400]
+        return past_messages
     elif thread_ts:
         # For threads, get all replies
         return client.conversations_replies(
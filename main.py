@@ -1,9 +1,10 @@
 import logging
 import os
+from concurrent.futures import ThreadPoolExecutor
 
 from slack_bolt import App
 
-from lib.env import SLACK_APP_LOG_LEVEL
+from lib.env import LISTENER_WORKERS, SLACK_APP_LOG_LEVEL
 from plugins.file_plugin import FilePlugin
 from slaick import Slaick
 
@@ -11,6 +12,11 @@ app = App(
     token=os.environ["SLACK_BOT_TOKEN"],
     before_authorize=Slaick.before_authorize,
     process_before_response=True,
+    # Events are acked immediately; the lazy listeners doing the LLM work run on this
+    # bounded pool so a burst of events queues up instead of spawning unbounded work
+    listener_executor=ThreadPoolExecutor(
+        max_workers=LISTENER_WORKERS, thread_name_prefix="slaick-listener"
+    ),
 )
 
 # Set up Slaick
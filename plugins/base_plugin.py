@@ -1,6 +1,9 @@
 import logging
+import threading
 from abc import ABC, abstractmethod
-from typing import Any, Dict, List
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Deque, Dict, List, Optional, Tuple
 
 from slack_bolt import BoltContext
 
@@ -18,22 +21,74 @@ class BasePlugin(ABC):
 
 
 class PluginManager:
+    MAX_WORKERS = 8  # Max plugins run concurrently across all messages
+    MAX_TASKS_PER_CALL = 4  # Max plugins one conversation runs at once, leaving room for others
+
     def __init__(self):
         self.plugins = []
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
 
     def register_plugin(self, plugin: BasePlugin):
         self.plugins.append(plugin)
 
-    def process_message(
+    def process_messages(
         self,
         context: BoltContext,
-        message: Dict[str, Any],
+        messages: List[Dict[str, Any]],
         logger: logging.Logger,
-        is_last_message: bool,
-    ) -> List[Dict[str, Any]]:
-        content = []
-        for plugin in self.plugins:
-            if plugin.run_on_last_message_only and not is_last_message:
-                continue
-            content.extend(plugin.process_message(context, message, logger))
-        return content
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Run the plugins over a whole conversation at once.
+
+        The (message, plugin) pairs are submitted to the shared pool, so slow plugin work
+        such as file downloads overlaps across messages instead of running one message
+        at a time. At most MAX_TASKS_PER_CALL pairs are in flight at once, so a
+        conversation with many attachments can't hold up plugins for other events.
+
+        Returns:
+            List[List[Dict[str, Any]]]: The plugin content for each message, in message order
+            and, within a message, in plugin registration order.
+        """
+        last_index = len(messages) - 1
+        tasks = [
+            (index, plugin, message)
+            for index, message in enumerate(messages)
+            for plugin in self.plugins
+            if index == last_index or not plugin.run_on_last_message_only
+        ]
+        contents: List[List[Dict[str, Any]]] = [[] for _ in messages]
+        if len(tasks) <= 1:
+            # Nothing to overlap, skip the thread hand-off
+            for index, plugin, message in tasks:
+                contents[index].extend(plugin.process_message(context, message, logger))
+            return contents
+
+        executor = self._get_executor()
+        in_flight: Deque[Tuple[int, Future]] = deque()
+        for index, plugin, message in tasks:
+            if len(in_flight) == self.MAX_TASKS_PER_CALL:
+                # Results are collected in order anyway, so wait for the oldest task
+                done_index, future = in_flight.popleft()
+                contents[done_index].extend(future.result())
+            in_flight.append(
+                (index, executor.submit(plugin.process_message, context, message, logger))
+            )
+        for index, future in in_flight:
+            contents[index].extend(future.result())
+        return contents
+
+    def shutdown(self):
+        with self._executor_lock:
+            if self._executor is not None:
+                self._executor.shutdown(wait=True)
+                self._executor = None
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.MAX_WORKERS,
+                    thread_name_prefix="plugin",
+                )
+            return self._executor
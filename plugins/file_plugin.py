@@ -1,21 +1,59 @@
 from .base_plugin import BasePlugin
-from typing import List, Dict, Any
+from concurrent.futures import ThreadPoolExecutor
+from typing import List, Dict, Any, FrozenSet, Tuple
 from slack_bolt import BoltContext
 import logging
 from lib import env
 from lib.llm import LLMClient
-import base64
+from pybase64 import b64encode_as_string
+import codecs
 from io import BytesIO
-from PIL import Image
+import requests
+from requests.adapters import HTTPAdapter
 from slack_sdk.errors import SlackApiError
+from urllib3.util.retry import Retry
+
+# Max files downloaded at once across all messages and events; matches the connection pool
+MAX_CONCURRENT_DOWNLOADS = 8
+
+# Shared session so consecutive file downloads reuse keep-alive connections to Slack;
+# transient connection failures and 5xx responses are retried with a short backoff. Retry-After
+# is ignored (urllib3 would sleep for as long as it asks, past TIMEOUT_SECONDS), so 429s, which
+# need it honoured, are not retried
+_SESSION = requests.Session()
+_SESSION.mount(
+    "https://",
+    HTTPAdapter(
+        pool_connections=MAX_CONCURRENT_DOWNLOADS,
+        pool_maxsize=MAX_CONCURRENT_DOWNLOADS,
+        max_retries=Retry(
+            total=2,
+            backoff_factor=0.2,
+            status_forcelist=(500, 502, 503, 504),
+            raise_on_status=False,
+            respect_retry_after_header=False,
+        ),
+    ),
+)
+DOWNLOAD_CONNECT_TIMEOUT_SECONDS = 3.05
+
+# Bounded pool for downloading and processing files, shared by all handler threads, so
+# there are never more downloads in flight than pooled connections to reuse
+_DOWNLOAD_POOL = ThreadPoolExecutor(
+    max_workers=MAX_CONCURRENT_DOWNLOADS, thread_name_prefix="file-plugin-download"
+)
+# Bounded pool for CPU-heavy image decoding/resizing, shared by all handler threads
+_IMAGE_POOL = ThreadPoolExecutor(max_workers=4, thread_name_prefix="file-plugin-image")
 
 
 class FilePlugin(BasePlugin):
     MAX_FILE_SIZE = 20 * 1024 * 1024  # 20 MB limit for vision API
     MAX_IMAGE_LENGTH = 1024  # Recommended max length for image px
+    MAX_PASSTHROUGH_IMAGE_BYTES = 256 * 1024  # Larger images are re-encoded even if small enough
+    MAX_TEXT_LENGTH = 200_000  # Max characters of a text file sent to the model
 
     SUPPORTED_FILE_TYPES = {
-        "text": [
+        "text": frozenset({
             "text", "applescript", "boxnote", "c", "csharp", "cpp", "css", "csv", "clojure",
             "coffeescript", "cfm", "d", "dart", "diff", "dockerfile", "email", "fsharp",
             "fortran", "go", "groovy", "html", "handlebars", "haskell", "haxe", "java",
@@ -24,23 +62,22 @@ class FilePlugin(BasePlugin):
             "puppet", "python", "r", "rtf", "ruby", "rust", "sql", "sass", "scala", "scheme",
             "shell", "smalltalk", "swift", "tsv", "vb", "vbscript", "vcard", "velocity",
             "verilog", "xml", "yaml",
-        ],
-        "image": ["ai", "bmp", "eps", "gif", "indd", "jpg", "png", "psd", "svg", "tiff"],
+        }),
+        "image": frozenset({"ai", "bmp", "eps", "gif", "indd", "jpg", "png", "psd", "svg", "tiff"}),
+    }
+    _EXT_TO_CATEGORY = {
+        ext: category for category, extensions in SUPPORTED_FILE_TYPES.items() for ext in extensions
     }
 
     def process_message(self, context: BoltContext, message: Dict[str, Any], logger: logging.Logger) -> List[Dict[str, Any]]:
-        content = []
         files = message.get("files", [])
-        logger.info(f"FilePlugin processing message: {message.get('text', '')[:100]}")
+        logger.info("FilePlugin processing message: %.100s", message.get("text", ""))
         if not files or not self.is_bot_able_to_access_files(context):
-            return content
-
-        for file in files:
-            file_content = self.process_file(context, file, logger)
-            if file_content:
-                content.append(file_content)
+            return []
 
-        return content
+        # Download and process attachments concurrently on the shared pool, in the original file order
+        futures = [_DOWNLOAD_POOL.submit(self.process_file, context, file, logger) for file in files]
+        return [file_content for file_content in (future.result() for future in futures) if file_content]
 
     def process_file(self, context: BoltContext, file: Dict[str, Any], logger: logging.Logger) -> Dict[str, Any]:
         slack_filetype = file.get("filetype")
@@ -48,44 +85,43 @@ class FilePlugin(BasePlugin):
         file_size = file.get("size", 0)
 
         if not slack_filetype or not slack_mimetype:
-            logger.info(f"Skipped unsupported file type: {slack_filetype}")
+            logger.info("Skipped unsupported file type: %s", slack_filetype)
             return {"type": "text", "text": f"Skipped unsupported file type: {slack_filetype}"}
 
         if file_size > self.MAX_FILE_SIZE:
-            logger.info(f"Skipped file exceeding size limit: {file.get('name', '')} ({file_size} bytes)")
+            logger.info("Skipped file exceeding size limit: %s (%s bytes)", file.get("name", ""), file_size)
             return {"type": "text", "text": f"Skipped file exceeding size limit: {file.get('name', '')} ({file_size} bytes)"}
 
+        # Decide whether the file is usable before spending a download on it
+        content_type = self.categorize_file(slack_filetype)
+
+        if content_type == "other":
+            logger.info("Skipped unsupported file type: %s", slack_filetype)
+            return {"type": "text", "text": f"Skipped unsupported file type: {slack_filetype}"}
+
+        if content_type == "image" and not LLMClient.is_model_able_to_receive_images():
+            logger.info("Model does not support images.")
+            return {"type": "text", "text": "Model does not support images."}
+
         file_url = file.get("url_private", "")
         try:
             file_content = self.download_slack_file_content(file_url, context.bot_token)
-        except SlackApiError as e:
-            logger.error(f"Failed to download file content: {e}")
+        except (SlackApiError, requests.RequestException) as e:
+            logger.error("Failed to download file content: %s", e)
             return {"type": "text", "text": f"Failed to download file: {file.get('name', '')}"}
 
-        content_type = self.categorize_file(slack_filetype)
-
         if content_type == "image":
             return self.process_image(file, file_content, slack_mimetype, logger)
-        elif content_type == "text":
-            return self.process_text(file, file_content)
-        else:
-            logger.info(f"Skipped unsupported file type: {slack_filetype}")
-            return {"type": "text", "text": f"Skipped unsupported file type: {slack_filetype}"}
+        return self.process_text(file, file_content)
 
     def process_image(self, file: Dict[str, Any], file_content: bytes, slack_mimetype: str, logger: logging.Logger) -> Dict[str, Any]:
-        if not LLMClient.is_model_able_to_receive_images():
-            logger.info("Model does not support images.")
-            return {"type": "text", "text": "Model does not support images."}
-
         try:
-            img = Image.open(BytesIO(file_content))
-            img.thumbnail((self.MAX_IMAGE_LENGTH, self.MAX_IMAGE_LENGTH))
-            buffer = BytesIO()
-            img.save(buffer, format=img.format)
-            resized_content = buffer.getvalue()
-            encoded_content = base64.b64encode(resized_content).decode("utf-8")
+            resized_content, slack_mimetype = _IMAGE_POOL.submit(
+                self.resize_image, file_content, slack_mimetype
+            ).result()
+            encoded_content = b64encode_as_string(resized_content)
         except Exception as e:
-            logger.error(f"Failed to process image: {e}")
+            logger.error("Failed to process image: %s", e)
             return {"type": "text", "text": f"Failed to process image: {file.get('name', '')}"}
 
         if env.PROVIDER == "bedrock" or env.PROVIDER == "anthropic":
@@ -93,51 +129,109 @@ class FilePlugin(BasePlugin):
                 "type": "image",
                 "source": {
                     "type": "base64",
-                    "media_type": f"{slack_mimetype}",
-                    "data": f"{encoded_content}",
+                    "media_type": slack_mimetype,
+                    "data": encoded_content,
                 }
             }
         else:
             return {
                 "type": "image_url",
-                "image_url": {"url": f"data:{slack_mimetype};base64,{encoded_content}"},
+                "image_url": {"url": "data:" + slack_mimetype + ";base64," + encoded_content},
             }
 
+    @classmethod
+    def resize_image(cls, file_content: bytes, mimetype: str) -> Tuple[bytes, str]:
+        # Pillow is imported on first use so processes that never see an image don't load it
+        from PIL import Image
+
+        # Image.open only parses the header; pixels are decoded on first use
+        img = Image.open(BytesIO(file_content))
+        if max(img.size) <= cls.MAX_IMAGE_LENGTH and len(file_content) <= cls.MAX_PASSTHROUGH_IMAGE_BYTES:
+            # Already small enough, send the original bytes without a decode/encode round-trip
+            return file_content, mimetype
+
+        # For JPEGs, have libjpeg decode at a reduced DCT scale (1/2, 1/4, 1/8) near the target size
+        img.draft("RGB", (cls.MAX_IMAGE_LENGTH, cls.MAX_IMAGE_LENGTH))
+        img.thumbnail((cls.MAX_IMAGE_LENGTH, cls.MAX_IMAGE_LENGTH), Image.Resampling.BILINEAR)
+        # Re-encode as JPEG: far smaller than e.g. PNG screenshots, so fewer bytes sent to the LLM
+        if img.mode in ("RGBA", "LA") or (img.mode == "P" and "transparency" in img.info):
+            img = img.convert("RGBA")
+            background = Image.new("RGB", img.size, (255, 255, 255))
+            background.paste(img, mask=img.getchannel("A"))
+            img = background
+        elif img.mode != "RGB":
+            img = img.convert("RGB")
+        buffer = BytesIO()
+        img.save(buffer, format="JPEG", quality=85, optimize=True, progressive=True)
+        return buffer.getvalue(), "image/jpeg"
+
     def process_text(self, file: Dict[str, Any], file_content: bytes) -> Dict[str, Any]:
+        # Each character takes at most 4 bytes, so only this prefix can end up in the message
+        max_bytes = self.MAX_TEXT_LENGTH * 4
+        truncated = len(file_content) > max_bytes
+        if truncated:
+            # The incremental decoder holds back a character cut in half at the end of the prefix
+            decoder = codecs.getincrementaldecoder("utf-8")(errors="replace")
+            text = decoder.decode(memoryview(file_content)[:max_bytes])
+        else:
+            text = file_content.decode("utf-8", errors="replace")
+        if truncated or len(text) > self.MAX_TEXT_LENGTH:
+            text = text[: self.MAX_TEXT_LENGTH] + "…[truncated]"
         return {
             "type": "text",
-            "text": f"File: {file.get('name', '')}\n```{file_content.decode('utf-8')}```",
+            "text": "".join(("File: ", file.get("name", ""), "\n```", text, "```")),
         }
 
     @staticmethod
     def categorize_file(file_extension: str) -> str:
-        for category, extensions in FilePlugin.SUPPORTED_FILE_TYPES.items():
-            if file_extension in extensions:
-                return category
-        return "other"
+        return FilePlugin._EXT_TO_CATEGORY.get(file_extension, "other")
 
     @staticmethod
-    def download_slack_file_content(file_url: str, bot_token: str) -> bytes:
-        import requests
-        response = requests.get(
+    def download_slack_file_content(file_url: str, bot_token: str, max_file_size: int = MAX_FILE_SIZE) -> bytes:
+        # Stream the body so an oversized file is rejected without downloading all of it
+        with _SESSION.get(
             file_url,
             headers={"Authorization": f"Bearer {bot_token}"},
-        )
-        if response.status_code != 200:
-            error = f"Request to {file_url} failed with status code {response.status_code}"
-            raise SlackApiError(error, response)
-
-        content_type = response.headers.get("content-type", "")
-
-        if content_type.startswith("text/html"):
-            error = f"You don't have the permission to download this file: {file_url}"
-            raise SlackApiError(error, response)
-
-        return response.content
+            # Fail fast on an unreachable host, but give large files the full read timeout
+            timeout=(DOWNLOAD_CONNECT_TIMEOUT_SECONDS, env.TIMEOUT_SECONDS),
+            stream=True,
+        ) as response:
+            if response.status_code != 200:
+                error = f"Request to {file_url} failed with status code {response.status_code}"
+                raise SlackApiError(error, response)
+
+            content_type = response.headers.get("content-type", "")
+
+            if content_type.startswith("text/html"):
+                error = f"You don't have the permission to download this file: {file_url}"
+                raise SlackApiError(error, response)
+
+            if int(response.headers.get("content-length", 0)) > max_file_size:
+                error = f"File exceeds size limit of {max_file_size} bytes: {file_url}"
+                raise SlackApiError(error, response)
+
+            chunks = []
+            total_size = 0
+            for chunk in response.iter_content(chunk_size=64 * 1024):
+                total_size += len(chunk)
+                if total_size > max_file_size:
+                    error = f"File exceeds size limit of {max_file_size} bytes: {file_url}"
+                    raise SlackApiError(error, response)
+                chunks.append(chunk)
+
+        return b"".join(chunks)
 
     @staticmethod
     def is_bot_able_to_access_files(context: BoltContext) -> bool:
         if env.FILE_ACCESS_ENABLED is False:
             return False
-        bot_scopes = context.authorize_result.bot_scopes or []  # type: ignore
-        return bool(context and "files:read" in bot_scopes)
+        return bool(context and "files:read" in FilePlugin.get_bot_scopes(context))
+
+    @staticmethod
+    def get_bot_scopes(context: BoltContext) -> FrozenSet[str]:
+        # Computed once per event and stored on the context, which every message of the event shares
+        bot_scopes = context.get("bot_scope_set")
+        if bot_scopes is None:
+            bot_scopes = frozenset(context.authorize_result.bot_scopes or [])  # type: ignore
+            context["bot_scope_set"] = bot_scopes
+        return bot_scopes
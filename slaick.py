@@ -1,14 +1,17 @@
-import json
+import functools
 import logging
 import os
 import sys
 import threading
 import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from importlib import import_module
-from typing import Any, Callable, Dict, List, Optional
+from typing import Any, Callable, Dict, List, Optional, Tuple
 
 import litellm
 import openai
+import orjson
 from slack_bolt import App, BoltContext, BoltResponse
 from slack_bolt.adapter.socket_mode import SocketModeHandler
 from slack_bolt.request.payload_utils import is_event
@@ -19,17 +22,30 @@ vendor_dir = os.path.abspath(os.path.join(os.path.dirname(__file__), "vendor/cha
 sys.path.insert(0, vendor_dir)
 
 from lib import env, formatting, llm, slack
+from lib.redaction import redact_string
 from plugins.base_plugin import PluginManager
 from vendor.chatgptinslack.app.i18n import translate
-from vendor.chatgptinslack.app.sensitive_info_redaction import redact_string
 from vendor.chatgptinslack.app.slack_constants import TIMEOUT_ERROR_MESSAGE
-from vendor.chatgptinslack.app.slack_ops import find_parent_message, is_this_app_mentioned
 
 
 class Slaick:
-    MESSAGE_SUBTYPES_TO_SKIP = ["message_changed", "message_deleted"]
+    MESSAGE_SUBTYPES_TO_SKIP = frozenset({"message_changed", "message_deleted"})
+    # In-progress replies are updated at most this often, and only after this much new text;
+    # updates wait for the end of a sentence or line unless the pending text is long
+    STREAM_UPDATE_INTERVAL_SECONDS = 0.8
+    STREAM_UPDATE_MIN_NEW_CHARACTERS = 40
+    STREAM_UPDATE_MAX_NEW_CHARACTERS = 400
+    STREAM_UPDATE_BOUNDARIES = frozenset({".", "!", "?", "\n"})
+    MESSAGE_TEXT_CACHE_SIZE = 4096
     llm_client = llm.LLMClient()
     plugin_manager = None
+    # LRU of (channel, ts, edited ts, translate_markdown) -> message text sent to the LLM
+    _message_text_cache: "OrderedDict[Tuple[str, str, Optional[str], bool], str]" = OrderedDict()
+    _message_text_cache_lock = threading.Lock()
+    # Runs Slack calls that can overlap with other work of the same event
+    background_executor = ThreadPoolExecutor(
+        max_workers=env.LISTENER_WORKERS, thread_name_prefix="slaick-background"
+    )
 
     @classmethod
     def initialize(cls, plugins=None):
@@ -92,7 +108,12 @@ class Slaick:
         Start the SocketModeHandler for the Slack app.
         """
         handler = SocketModeHandler(app, os.environ["SLACK_APP_TOKEN"])
-        handler.start()
+        try:
+            handler.start()
+        finally:
+            if Slaick.plugin_manager is not None:
+                Slaick.plugin_manager.shutdown()
+            Slaick.background_executor.shutdown(wait=False)
 
     @staticmethod
     def register_event_handler(app: App, event_type: str, handler: Callable):
@@ -130,8 +151,8 @@ class Slaick:
         """
         thread_ts = payload.get("thread_ts")
         if thread_ts:
-            parent_message = find_parent_message(client, context.channel_id, thread_ts)
-            if parent_message and is_this_app_mentioned(context, parent_message):
+            parent_message = slack.find_parent_message_cached(client, context.channel_id, thread_ts)
+            if parent_message and slack.is_bot_mentioned(context, parent_message):
                 return  # The message event handler will reply to this
 
         Slaick._process_message(context, payload, client, logger)
@@ -195,6 +216,7 @@ class Slaick:
                 text="To use this app, please configure your LLM API key first",
             )
             return
+        wip_reply = None  # Not posted until the messages are known to fit
         try:
             # Determine if the message is in a DM or a thread
             is_in_dm_with_bot = payload.get("channel_type") in ["im", "mpim"]
@@ -221,10 +243,8 @@ class Slaick:
             messages = Slaick._prepare_messages(context, messages_in_context)
             user_id = context.actor_user_id or context.user_id
 
-            # Send a "work in progress" message to Slack
-            wip_reply = slack.send_wip_message(context, client, payload, messages)
-
-            # Ensure messages fit within the context window
+            # Ensure messages fit within the context window; tokenizing is local, so do it
+            # before any Slack write
             messages, num_context_tokens, max_context_tokens = (
                 cls.llm_client.messages_within_context_window(
                     messages,
@@ -234,30 +254,36 @@ class Slaick:
 
             # Handle cases where the message is too long
             if num_context_tokens > max_context_tokens:
-                slack.handle_long_message(
+                slack.post_long_message_error(
                     client,
                     context,
-                    wip_reply,
+                    payload,
                     num_context_tokens,
                     max_context_tokens,
                 )
-            else:
-                # Process the OpenAI response
-                Slaick._process_litellm_response(
-                    context,
-                    client,
-                    payload,
-                    messages,
-                    wip_reply,
-                    user_id,  # type: ignore
-                )
+                return
+
+            # Send a "work in progress" message to Slack
+            wip_reply = slack.send_wip_message(context, client, payload, messages)
+
+            # Process the OpenAI response
+            Slaick._process_litellm_response(
+                context,
+                client,
+                payload,
+                messages,
+                wip_reply,
+                user_id,  # type: ignore
+            )
 
         except openai.APITimeoutError:
             # Handle timeout errors
-            slack.handle_timeout(client, context, wip_reply, env.LLM_API_KEY)  # type: ignore
+            Slaick._handle_timeout(client, context, wip_reply, env.LLM_API_KEY)  # type: ignore
         except Exception as e:
             # Handle general errors
-            slack.handle_error(client, context, wip_reply, logger, str(e), env.LLM_API_KEY)  # type: ignore
+            slack.handle_error(
+                client, context, payload, wip_reply, logger, str(e), env.LLM_API_KEY  # type: ignore
+            )
 
     @staticmethod
     def _prepare_messages(
@@ -277,31 +303,68 @@ class Slaick:
         system_text = formatting.get_system_text(env.SYSTEM_TEXT, env.TRANSLATE_MARKDOWN, context)
         messages.append({"role": "system", "content": system_text})
 
+        # Run the plugins for all messages up front so their downloads overlap
+        plugin_contents = Slaick.plugin_manager.process_messages(
+            context, messages_in_context, context.logger
+        )
+
+        # Read once instead of per message; BoltContext attributes are dict lookups
+        translate_markdown = env.TRANSLATE_MARKDOWN
+        bot_user_id = context.bot_user_id
+
         # Process each message in the context
-        for reply in messages_in_context:
+        for reply, plugin_content in zip(messages_in_context, plugin_contents):
             msg_user_id = reply.get("user")
-            reply_text = redact_string(reply.get("text", ""))
-            content = [
-                {
-                    "type": "text",
-                    "text": f"<@{msg_user_id}>: "
-                    + formatting.format_message_content_for_llm(reply_text, env.TRANSLATE_MARKDOWN),
-                }
-            ]
-
-            # process message using plugins
-            is_last_message = reply == messages_in_context[-1]
-            plugin_content = Slaick.plugin_manager.process_message(context, reply, context.logger, is_last_message)
+            text = Slaick._get_message_text(
+                context.channel_id, reply, translate_markdown, bot_user_id  # type: ignore
+            )
+            content = [{"type": "text", "text": text}]
             content.extend(plugin_content)
 
             messages.append(
                 {
                     "content": content,
-                    "role": ("assistant" if msg_user_id == context.bot_user_id else "user"),
+                    "role": ("assistant" if msg_user_id == bot_user_id else "user"),
                 }
             )
         return messages
 
+    @classmethod
+    def _get_message_text(
+        cls,
+        channel_id: str,
+        reply: Dict[str, Any],
+        translate_markdown: bool,
+        bot_user_id: Optional[str],
+    ) -> str:
+        """
+        Get the redacted, formatted text of a Slack message as sent to the LLM.
+
+        The whole thread is re-sent on every turn, so results are cached per message
+        (and per edit) to avoid redacting and formatting the same history again. The
+        bot's own replies are not cached: they are rewritten with chat.update while
+        streaming, so a copy read mid-stream would be a partial reply.
+        """
+        ts = reply.get("ts")
+        key = (channel_id, ts, (reply.get("edited") or {}).get("ts"), translate_markdown)
+        cacheable = ts is not None and reply.get("user") != bot_user_id
+        if cacheable:
+            with cls._message_text_cache_lock:
+                text = cls._message_text_cache.get(key)
+                if text is not None:
+                    cls._message_text_cache.move_to_end(key)
+                    return text
+
+        reply_text = redact_string(reply.get("text", ""))
+        formatted_text = formatting.format_message_content_for_llm(reply_text, translate_markdown)
+        text = f"<@{reply.get('user')}>: {formatted_text}"
+        if cacheable:
+            with cls._message_text_cache_lock:
+                cls._message_text_cache[key] = text
+                if len(cls._message_text_cache) > cls.MESSAGE_TEXT_CACHE_SIZE:
+                    cls._message_text_cache.popitem(last=False)
+        return text
+
     @classmethod
     def _process_litellm_response(
         cls,
@@ -315,18 +378,30 @@ class Slaick:
         """
         Process the litellm API response and update the Slack message accordingly.
         """
-        # Get the litellm response stream
-        stream = cls.llm_client.get_completion(messages, stream=True)
-
-        # Check if a new reply has come in since we started processing
-        latest_replies = client.conversations_replies(
+        # Check if a new reply has come in since we started processing. Only replies after
+        # the WIP message are requested (Slack always adds the parent), and one is enough.
+        # The check runs in the background while the LiteLLM request is being made, so it
+        # doesn't add a Slack round-trip before the first token.
+        wip_ts = wip_reply["message"]["ts"]
+        newer_replies_future = cls.background_executor.submit(
+            client.conversations_replies,
             channel=context.channel_id,  # type: ignore
             ts=wip_reply.get("ts"),  # type: ignore
-            include_all_metadata=True,
-            limit=1000,
+            oldest=wip_ts,
+            limit=2,
         )
-        if latest_replies.get("messages", [])[-1]["ts"] != wip_reply["message"]["ts"]:  # type: ignore
-            # A new reply has come in, so abandon this one
+
+        # Get the litellm response stream
+        stream = cls.llm_client.get_completion(messages, stream=True)
+
+        try:
+            newer_replies = newer_replies_future.result().get("messages", [])
+        except Exception:
+            Slaick._close_stream(stream, context.logger)
+            raise
+        if any(float(msg["ts"]) > float(wip_ts) for msg in newer_replies):  # type: ignore
+            # A new reply has come in, so abandon this one and release its connection
+            Slaick._close_stream(stream, context.logger)
             client.chat_delete(
                 channel=context.channel_id,  # type: ignore
                 ts=wip_reply["message"]["ts"],
@@ -344,11 +419,6 @@ class Slaick:
             translate_markdown=env.TRANSLATE_MARKDOWN,
         )
 
-    @classmethod
-    def _get_litellm_stream(cls, messages: List[Dict[str, Any]]) -> litellm.completion:
-        """Get the litellm response stream."""
-        return cls.llm_client.get_completion(messages, stream=True)
-
     @staticmethod
     def _handle_timeout(
         client: WebClient,
@@ -409,57 +479,104 @@ class Slaick:
         - It handles function calls embedded in the stream, executing the functions and updating the message accordingly.
         - The method ensures that the message does not exceed Slack's length limitations by splitting it into chunks.
         """
-        start_time = time.time()
+        deadline = time.monotonic() + timeout_seconds
         assistant_reply = {"role": "assistant", "content": ""}
         messages.append(assistant_reply)
-        word_count = 0
-        threads = []
-        function_call = {"name": "", "arguments": ""}
+        last_update_time = time.monotonic()
+        last_update_length = 0
+        # Function call deltas are collected per field and joined once the stream ends
+        function_call_parts: Dict[str, List[str]] = {"name": [], "arguments": []}
         loading_character = " ... :writing_hand:"
+
+        # A single background worker posts in-progress updates to Slack, so reading the
+        # stream never waits on the Slack API. Requests made while an update is in flight
+        # coalesce into one follow-up update with the latest content.
+        update_requested = threading.Event()
+        stream_finished = threading.Event()
+        # Only system messages are kept in the WIP message metadata, so in-progress updates
+        # get just those instead of the whole conversation; the final update gets everything
+        system_messages = [msg for msg in messages if msg["role"] == "system"]
+
+        def update_message_loop():
+            while True:
+                update_requested.wait()
+                # Clear before checking for the stop signal: clearing afterwards could
+                # swallow a wake-up from stop_updater and leave this loop waiting forever
+                update_requested.clear()
+                if stream_finished.is_set():
+                    return
+                try:
+                    slack.update_slack_message(
+                        client,
+                        context,
+                        wip_reply,
+                        assistant_reply,
+                        system_messages,
+                        loading_character,
+                        translate_markdown,
+                        context.logger,
+                    )
+                except Exception:
+                    context.logger.exception("Failed to update the in-progress message")
+
+        def stop_updater():
+            # Waits for an in-flight update so it cannot overwrite the final message;
+            # called before the final update and again from `finally`, which is a no-op
+            if stream_finished.is_set():
+                return
+            stream_finished.set()
+            update_requested.set()
+            updater.result()
+
+        # Runs on the shared background pool rather than a thread created per response
+        updater = cls.background_executor.submit(update_message_loop)
         try:
+            # Content deltas are collected in a list and joined only when an update is due;
+            # `+=` on the dict value would copy the whole reply for every delta
+            content_parts: List[str] = []
+            content_length = 0
             for chunk in stream:  # type: ignore
-                spent_seconds = time.time() - start_time
-                if timeout_seconds < spent_seconds:
+                # One clock read per chunk serves both the timeout and the update throttle
+                now = time.monotonic()
+                if now > deadline:
                     raise TimeoutError()
 
-                if not chunk.choices:
+                choices = chunk.choices
+                if not choices:
                     continue
 
-                delta = chunk.choices[0].delta
-                if delta.content is not None:
-                    word_count += 1
-                    assistant_reply["content"] += delta.get("content")
-                    if word_count >= 20:
-
-                        def update_message():
-                            slack.update_slack_message(
-                                client,
-                                context,
-                                wip_reply,
-                                assistant_reply,
-                                messages,
-                                loading_character,
-                                translate_markdown,
-                                context.logger,
-                            )
-
-                        thread = threading.Thread(target=update_message)
-                        thread.daemon = True
-                        thread.start()
-                        threads.append(thread)
-                        word_count = 0
-                elif delta.get("function_call") is not None:  # type: ignore
-                    if assistant_reply["content"] == "":
-                        for k in function_call.keys():
-                            function_call[k] += delta["function_call"].get(k) or ""  # type: ignore
-                        assistant_reply["function_call"] = function_call  # type: ignore
-
-            for t in threads:
-                try:
-                    if t.is_alive():
-                        t.join()
-                except Exception:
-                    pass
+                delta = choices[0].delta
+                content = delta.content
+                if content is not None:
+                    content_parts.append(content)
+                    content_length += len(content)
+                    # Throttle by time and new text rather than chunk count, so fast
+                    # streams don't turn into a flood of chat.update calls, and prefer
+                    # sentence ends so Slack doesn't render half-written words or markdown
+                    new_characters = content_length - last_update_length
+                    if now - last_update_time >= cls.STREAM_UPDATE_INTERVAL_SECONDS and (
+                        new_characters >= cls.STREAM_UPDATE_MAX_NEW_CHARACTERS
+                        or (
+                            new_characters >= cls.STREAM_UPDATE_MIN_NEW_CHARACTERS
+                            and content[-1:] in cls.STREAM_UPDATE_BOUNDARIES
+                        )
+                    ):
+                        assistant_reply["content"] = "".join(content_parts)
+                        update_requested.set()
+                        last_update_time = now
+                        last_update_length = content_length
+                elif content_length == 0:
+                    # Function calls only count before any content, so skip the lookup after
+                    delta_function_call = delta.get("function_call")  # type: ignore
+                    if delta_function_call is not None:
+                        for k, parts in function_call_parts.items():
+                            parts.append(delta_function_call.get(k) or "")  # type: ignore
+
+            assistant_reply["content"] = "".join(content_parts)
+            function_call = {k: "".join(parts) for k, parts in function_call_parts.items()}
+            if function_call_parts["name"]:
+                assistant_reply["function_call"] = function_call  # type: ignore
+            stop_updater()
 
             if function_call["name"] != "":
                 Slaick._handle_function_call(
@@ -468,7 +585,7 @@ class Slaick:
                     wip_reply,
                     messages,
                     function_call,
-                    timeout_seconds - (time.time() - start_time),
+                    max(0.0, deadline - time.monotonic()),
                     translate_markdown,
                 )
             else:
@@ -484,17 +601,24 @@ class Slaick:
                 )
 
         finally:
-            for t in threads:
-                try:
-                    if t.is_alive():
-                        t.join()
-                except Exception:
-                    pass
-            try:
-                if stream is not None and hasattr(stream, "close"):
-                    stream.close()
-            except Exception:
-                pass
+            stop_updater()
+            Slaick._close_stream(stream, context.logger)
+
+    @staticmethod
+    def _close_stream(stream: Any, logger: logging.Logger) -> None:
+        """Close a LiteLLM stream, releasing its HTTP connection."""
+        try:
+            if stream is not None and hasattr(stream, "close"):
+                stream.close()
+        except Exception:
+            # Closing is best effort and must not mask the original error, but keep a trace
+            logger.debug("Failed to close the LiteLLM stream", exc_info=True)
+
+    @staticmethod
+    @functools.lru_cache(maxsize=32)
+    def _resolve_function(function_call_module_name: str, function_name: str) -> Callable:
+        """Get a function from the function call module, resolved once per name."""
+        return getattr(import_module(function_call_module_name), function_name)
 
     @classmethod
     def _handle_function_call(
@@ -509,9 +633,8 @@ class Slaick:
     ):
         """Handle function calls from the OpenAI response."""
         function_call_module_name = context.get("OPENAI_FUNCTION_CALL_MODULE_NAME", "")
-        function_call_module = import_module(function_call_module_name)  # type: ignore
-        function_to_call = getattr(function_call_module, function_call["name"])
-        function_args = json.loads(function_call["arguments"])
+        function_to_call = Slaick._resolve_function(function_call_module_name, function_call["name"])
+        function_args = orjson.loads(function_call["arguments"])
         function_response = function_to_call(**function_args)
         function_message = {
             "role": "function",
@@ -520,7 +643,8 @@ class Slaick:
         }
         messages.append(function_message)
 
-        cls.llm_client.messages_within_context_window(
+        # Earlier messages hit the token count cache, so only the new ones are tokenized
+        messages, _, _ = cls.llm_client.messages_within_context_window(
             messages,
             function_call_module_name,
         )
@@ -0,0 +1,39 @@
+from lib.formatting import MAX_CHUNK_LENGTH, iter_split_message, split_message
+
+
+def test_short_message_is_a_single_chunk():
+    assert split_message("  hello world \n") == ["hello world"]
+
+
+def test_lines_are_grouped_into_chunks_within_the_limit():
+    lines = [f"line {i:03d} " + "x" * 40 for i in range(200)]
+    chunks = split_message("\n".join(lines), max_chunk_length=500)
+    assert len(chunks) > 1
+    assert all(len(chunk) <= 500 for chunk in chunks)
+    # Lines are kept whole and in order
+    assert "\n".join(chunks).split("\n") == lines
+
+
+def test_long_line_is_cut_at_the_last_space_within_the_limit():
+    words = [f"word{i:02d}" for i in range(40)]  # 6 characters each
+    chunks = split_message(" ".join(words), max_chunk_length=20)
+    assert all(len(chunk) <= 20 for chunk in chunks)
+    # Every cut falls between words, and only the separating spaces are dropped
+    assert " ".join(chunks).split(" ") == words
+
+
+def test_long_line_without_spaces_is_hard_cut():
+    line = "x" * 45
+    assert split_message(line, max_chunk_length=20) == ["x" * 20, "x" * 20, "x" * 5]
+
+
+def test_iter_split_message_is_lazy():
+    chunks = iter_split_message(("y" * 100 + "\n") * 100, max_chunk_length=250)
+    assert len(next(chunks)) <= 250
+    assert sum(1 for _ in chunks) > 0
+
+
+def test_default_limit():
+    chunks = split_message("z " * MAX_CHUNK_LENGTH)
+    assert len(chunks) == 2
+    assert all(len(chunk) <= MAX_CHUNK_LENGTH for chunk in chunks)
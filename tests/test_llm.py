@@ -0,0 +1,94 @@
+import pytest
+
+from lib import env, llm
+
+MAX_CONTEXT_TOKENS = 100
+REPLY_PRIMING_TOKENS = 3
+TOKENS_PER_MESSAGE = 4
+
+
+def count_words(content):
+    if isinstance(content, list):
+        return sum(len(part["text"].split()) for part in content if part["type"] == "text")
+    return len((content or "").split())
+
+
+def fake_token_counter(model, messages=None, text=None):
+    # One token per word. For messages, OpenAI-style: a fixed cost per message and 3 tokens
+    # per request; like litellm, function calls and non-`image_url` images are skipped
+    if text is not None:
+        return len(text.split())
+    return REPLY_PRIMING_TOKENS + sum(
+        TOKENS_PER_MESSAGE + count_words(message["content"]) for message in messages
+    )
+
+
+@pytest.fixture
+def client(monkeypatch):
+    monkeypatch.setattr(llm.litellm, "token_counter", fake_token_counter)
+    monkeypatch.setattr(llm, "get_max_context_tokens", lambda *args: MAX_CONTEXT_TOKENS)
+    llm.get_reply_priming_tokens.cache_clear()
+    yield llm.LLMClient()
+    llm.get_reply_priming_tokens.cache_clear()
+
+
+def message(role, num_words):
+    return {"role": role, "content": " ".join(["word"] * num_words)}
+
+
+def test_per_message_counts_sum_to_the_whole_conversation(client):
+    messages = [message("system", 5), message("user", 7), message("assistant", 11)]
+    total = REPLY_PRIMING_TOKENS + sum(client.count_message_tokens(msg) for msg in messages)
+    assert total == fake_token_counter(env.LLM_MODEL, messages)
+
+
+def test_function_call_arguments_are_counted(client):
+    function_call = {"name": "search", "arguments": " ".join(["word"] * 2000)}
+    reply = {"role": "assistant", "content": None, "function_call": function_call}
+    assert client.count_message_tokens(reply) == TOKENS_PER_MESSAGE + 2000
+
+
+def test_anthropic_image_blocks_are_counted(client):
+    image = {"type": "image", "source": {"type": "base64", "media_type": "image/jpeg", "data": "A"}}
+    content = [{"type": "text", "text": "look at this"}, image, image]
+    message = {"role": "user", "content": content}
+    assert client.count_message_tokens(message) == TOKENS_PER_MESSAGE + 3 + 2 * llm.IMAGE_TOKEN_COUNT
+
+
+def test_image_url_blocks_are_left_to_litellm(client):
+    image_url = {"type": "image_url", "image_url": {"url": "data:image/jpeg;base64,A"}}
+    message = {"role": "user", "content": [{"type": "text", "text": "look"}, image_url]}
+    assert client.count_message_tokens(message) == TOKENS_PER_MESSAGE + 1
+
+
+def test_messages_within_budget_are_returned_unchanged(client):
+    messages = [message("system", 10), message("user", 20), message("assistant", 20)]
+    trimmed, num_tokens, max_tokens = client.messages_within_context_window(messages)
+    assert trimmed is messages
+    assert num_tokens == fake_token_counter(env.LLM_MODEL, messages) == 65
+    assert max_tokens == MAX_CONTEXT_TOKENS
+
+
+def test_oldest_messages_are_trimmed_and_the_system_message_kept(client):
+    system = message("system", 10)
+    history = [message("user", 26), message("assistant", 26), message("user", 26)]
+    trimmed, num_tokens, _ = client.messages_within_context_window([system] + history)
+    # 3 + 14 for the system message, 30 per history message: only two of them fit
+    assert trimmed == [system] + history[1:]
+    assert num_tokens == 77 == fake_token_counter(env.LLM_MODEL, trimmed)
+
+
+def test_conversation_that_cannot_fit_is_reported(client):
+    system = message("system", 120)
+    trimmed, num_tokens, max_tokens = client.messages_within_context_window(
+        [system, message("user", 5)]
+    )
+    assert trimmed == [system]
+    assert num_tokens > max_tokens
+
+
+def test_serialize_message_falls_back_for_non_json_values():
+    message = {"role": "user", "content": "hi"}
+    assert llm.serialize_message(message) == b'{"role":"user","content":"hi"}'
+    unserializable = {"role": "assistant", "content": object()}
+    assert llm.serialize_message(unserializable) == str(unserializable).encode()
@@ -0,0 +1,92 @@
+import pytest
+
+from lib import env, redaction
+
+
+@pytest.fixture(autouse=True)
+def clear_pattern_cache():
+    redaction.get_redact_patterns.cache_clear()
+    yield
+    redaction.get_redact_patterns.cache_clear()
+
+
+@pytest.fixture
+def redaction_enabled(monkeypatch):
+    monkeypatch.setattr(env, "REDACTION_ENABLED", True)
+
+
+def use_user_defined_pattern(monkeypatch, pattern: str):
+    monkeypatch.setattr(env, "REDACT_USER_DEFINED_PATTERN", pattern)
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("mail jane.doe@example.com today", "mail [EMAIL] today"),
+        ("call (555) 123-4567 now", "call [PHONE] now"),
+        ("call 555.123.4567 now", "call [PHONE] now"),
+        ("card 4111 1111 1111 1111 ok", "card [CREDIT CARD] ok"),
+        ("card 4111-1111-1111-1111 ok", "card [CREDIT CARD] ok"),
+        ("ssn 123-45-6789 ok", "ssn [SSN] ok"),
+        ("nothing to see here", "nothing to see here"),
+    ],
+)
+def test_redacts_each_pattern(redaction_enabled, text, expected):
+    assert redaction.redact_string(text) == expected
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("card 4111111111111111, call 555-123-4567", "card [CREDIT CARD], call [PHONE]"),
+        ("card 4111 1111 1111 1111, call 555-123-4567", "card [CREDIT CARD], call [PHONE]"),
+        # A phone-like prefix must not eat the start of the card number that follows it
+        ("call 555 123 4111 1111 1111 1111", "call 555 123 [CREDIT CARD]"),
+        # No card match here; the phone and SSN patterns still cover every digit
+        ("x 4111111111111111234", "x [SSN][PHONE]"),
+    ],
+)
+def test_card_numbers_overlapping_phone_numbers(redaction_enabled, text, expected):
+    assert redaction.redact_string(text) == expected
+
+
+def test_redaction_disabled(monkeypatch):
+    monkeypatch.setattr(env, "REDACTION_ENABLED", False)
+    text = "mail jane.doe@example.com, card 4111111111111111"
+    assert redaction.redact_string(text) == text
+
+
+def test_invalid_pattern_is_ignored_while_redaction_is_disabled(monkeypatch):
+    monkeypatch.setattr(env, "REDACTION_ENABLED", False)
+    use_user_defined_pattern(monkeypatch, "(")
+    assert redaction.redact_string("text") == "text"
+
+
+def test_invalid_pattern_fails_when_redacting(redaction_enabled, monkeypatch):
+    use_user_defined_pattern(monkeypatch, "(")
+    with pytest.raises(ValueError, match="REDACT_USER_DEFINED_PATTERN"):
+        redaction.redact_string("text")
+
+
+def test_user_defined_pattern(redaction_enabled, monkeypatch):
+    use_user_defined_pattern(monkeypatch, r"\bproject-[a-z]+\b")
+    assert redaction.redact_string("about project-falcon, 555-123-4567") == (
+        "about [REDACTED], [PHONE]"
+    )
+
+
+def test_user_defined_pattern_with_backreference(redaction_enabled, monkeypatch):
+    use_user_defined_pattern(monkeypatch, r"\b(\w)\1{3,}\b")
+    assert redaction.redact_string("token aaaaaa here") == "token [REDACTED] here"
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        ("card \uff14\uff11\uff11\uff11" + "\uff11" * 12 + " ok", "card [CREDIT CARD] ok"),
+        ("call 555\x0b123\x0b4567 ok", "call [PHONE] ok"),
+    ],
+)
+def test_unicode_character_classes(redaction_enabled, text, expected):
+    # `\d` and `\s` match full-width digits and every Unicode whitespace character
+    assert redaction.redact_string(text) == expected